@@ -0,0 +1,78 @@
+"""
+Local SQLite cache for fetched Gmail messages
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import get_config
+
+class MessageCache:
+    """Persistent cache of fetched email details keyed by message ID.
+
+    Gmail message bodies are immutable once delivered, so a warm run can
+    serve every previously fetched message straight from disk — no
+    network round-trips and no API quota spent on repeats.
+    """
+
+    def __init__(self, db_file: Optional[str] = None):
+        if db_file is None:
+            db_file = os.path.join(get_config().BASE_DIR, 'message_cache.db')
+        # The pipeline fetches batches from worker threads, so share one
+        # connection guarded by a lock instead of one per thread
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                subject TEXT,
+                from_ TEXT,
+                date TEXT,
+                body BLOB,
+                fetched_at INTEGER
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        """Return the cached email details for a message ID, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT subject, from_, date, body FROM messages WHERE id = ?',
+                (message_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        subject, from_, date, body = row
+        return {
+            'id': message_id,
+            'subject': subject,
+            'from': from_,
+            'date': date,
+            'body': body.decode('utf-8', 'replace')
+        }
+
+    def put(self, email_data: Dict) -> None:
+        """Store one fetched email's details"""
+        self.put_many([email_data])
+
+    def put_many(self, email_details: List[Dict]) -> None:
+        """Store a batch of fetched email details in one transaction"""
+        if not email_details:
+            return
+        now = int(time.time())
+        rows = [
+            (email_data['id'], email_data['subject'], email_data['from'],
+             email_data['date'], email_data['body'].encode('utf-8'), now)
+            for email_data in email_details
+        ]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO messages '
+                '(id, subject, from_, date, body, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._conn.commit()
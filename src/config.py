@@ -1,41 +1,66 @@
 """
 Configuration settings for Swiggy Analysis application
 """
+import functools
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
 
-# Load environment variables from .env file if it exists
-load_dotenv()
+from dotenv import load_dotenv
 
+@dataclass(frozen=True, slots=True)
 class Config:
     # File paths
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    AUTH_DIR = os.path.join(BASE_DIR, 'auth')
-    CREDENTIALS_FILE = os.path.join(AUTH_DIR, 'credentials.json')
-    TOKEN_FILE = os.path.join(AUTH_DIR, 'token.json')
-    
+    BASE_DIR: str
+    AUTH_DIR: str
+    CREDENTIALS_FILE: str
+    TOKEN_FILE: str
+
     # Gmail search parameters
-    SWIGGY_SENDER = 'noreply@swiggy.in'
-    
+    SWIGGY_SENDER: str
+
     # We'll focus primarily on sender and look for order-related content
     # rather than relying heavily on subject lines
-    DELIVERY_SUBJECT_KEYWORDS = [
-        "delivered",
-        "delivery",
-        "order",
-        "swiggy"
-    ]
-    
+    DELIVERY_SUBJECT_KEYWORDS: tuple
+
     # Content validation keywords that indicate a Swiggy order email
-    ORDER_CONTENT_MARKERS = [
-        "Your Order Summary:",
-        "Order No:",
-        "Order placed at:",
-        "Order delivered at:",
-        "Ordered from:",
-        "Delivery To:"
-    ]
-    
+    ORDER_CONTENT_MARKERS: tuple
+
     # Date range for analysis (None means all emails)
-    START_DATE = os.getenv('START_DATE', '2016/01/01')  # Format: 'YYYY/MM/DD'
-    END_DATE = os.getenv('END_DATE', '2025/12/31')      # Format: 'YYYY/MM/DD'
\ No newline at end of file
+    START_DATE: str  # Format: 'YYYY/MM/DD'
+    END_DATE: str    # Format: 'YYYY/MM/DD'
+
+@functools.cache
+def get_config() -> Config:
+    """Build the application config exactly once per process.
+
+    .env loading and path joins happen here instead of at import time,
+    so repeated `from config import get_config` stays free.
+    """
+    load_dotenv()
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    auth_dir = os.path.join(base_dir, 'auth')
+
+    return Config(
+        BASE_DIR=base_dir,
+        AUTH_DIR=auth_dir,
+        CREDENTIALS_FILE=os.path.join(auth_dir, 'credentials.json'),
+        TOKEN_FILE=os.path.join(auth_dir, 'token.json'),
+        SWIGGY_SENDER='noreply@swiggy.in',
+        DELIVERY_SUBJECT_KEYWORDS=(
+            "delivered",
+            "delivery",
+            "order",
+            "swiggy",
+        ),
+        ORDER_CONTENT_MARKERS=(
+            "Your Order Summary:",
+            "Order No:",
+            "Order placed at:",
+            "Order delivered at:",
+            "Ordered from:",
+            "Delivery To:",
+        ),
+        START_DATE=os.getenv('START_DATE', '2016/01/01'),
+        END_DATE=os.getenv('END_DATE', '2025/12/31'),
+    )
@@ -3,143 +3,163 @@ Simplified data pipeline for collecting Swiggy order data from email text
 """
 import os
 import csv
-from datetime import datetime
-from typing import List, Dict, Optional
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Optional
 
-from config import Config
+import pandas as pd
+from tqdm import tqdm
+
+from config import get_config
 from gmail_client import GmailClient
 from email_text_parser import SwiggyEmailParser
 
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger(__name__)
+
+CSV_FIELDNAMES = [
+    'email_id',
+    'restaurant_name',
+    'order_time',
+    'delivery_time',
+    'delivery_duration_mins',
+    'total_amount',
+    'discount_amount'
+]
+
+# Module-level parser so parse_body is picklable for ProcessPoolExecutor
+_parser = SwiggyEmailParser()
+
+def parse_body(body: str) -> Optional[Dict]:
+    """Parse a single email body into order details (runs in worker processes)"""
+    return _parser.parse_email(body)
+
+def _format_row(order: Dict) -> Dict:
+    """Format one parsed order as a CSV row"""
+    return {
+        'email_id': order.get('email_id'),
+        'restaurant_name': order.get('restaurant_name'),
+        'order_time': order.get('order_time').strftime('%Y-%m-%d %H:%M:%S') if order.get('order_time') else None,
+        'delivery_time': order.get('delivery_time').strftime('%Y-%m-%d %H:%M:%S') if order.get('delivery_time') else None,
+        'delivery_duration_mins': order.get('delivery_duration_mins'),
+        'total_amount': order.get('total_amount'),
+        'discount_amount': order.get('discount_amount', 0.0)
+    }
+
 class SwiggyDataPipeline:
     def __init__(self):
         self.gmail_client = GmailClient()
         self.email_parser = SwiggyEmailParser()
-        self.csv_orders_file = os.path.join(Config.BASE_DIR, 'swiggy_orders.csv')
+        self.csv_orders_file = os.path.join(get_config().BASE_DIR, 'swiggy_orders.csv')
         
     def run_pipeline(self, max_emails: int = 5000):
         """Run the email processing pipeline"""
-        print("🚀 Starting Swiggy Data Pipeline...")
-        
-        # Step 1: Search for emails
-        print("\n📧 Step 1: Searching for Swiggy delivery emails...")
-        messages = self.gmail_client.search_swiggy_emails(max_emails)
-        print(f"Found {len(messages)} emails to process")
-        
-        if not messages:
-            print("No emails found. Please check your Gmail API setup and search criteria.")
-            return
+        logger.info("🚀 Starting Swiggy Data Pipeline...")
         
-        # Step 2: Process each email
-        print("\n🔄 Step 2: Processing emails...")
-        processed_orders = []
+        # Step 1: Search for emails — IDs stream in page by page, and each
+        # full chunk is handed to the fetch pool while the next list page
+        # is still in flight
+        logger.info("📧 Step 1: Searching for Swiggy delivery emails...")
+
+        # Skip messages already in the CSV — Gmail bodies are immutable,
+        # so re-runs only pay for emails that arrived since the last one
+        seen_ids = set()
+        if os.path.exists(self.csv_orders_file):
+            seen_ids = set(pd.read_csv(self.csv_orders_file, usecols=['email_id'])['email_id'])
+
+        # Step 2: Fetch, parse and write concurrently. Each completed
+        # fetch batch feeds the parse pool straight away, finished rows
+        # are flushed to the CSV as they arrive, and bodies are dropped
+        # once handed to a worker — peak memory stays bounded by the
+        # in-flight batches rather than the total order count
+        logger.info("🔄 Step 2: Processing emails...")
+        processed_count = 0
         failed_emails = []
-        
-        for i, message in enumerate(messages, 1):
-            message_id = message['id']
-            print(f"\n{'='*80}")
-            print(f"Processing email {i}/{len(messages)} (ID: {message_id})")
-            print(f"{'='*80}")
-            
-            # Get email details
-            email_data = self.gmail_client.get_email_details(message_id)
-            if not email_data:
-                print(f"  ❌ Failed to get email details")
-                continue
-            
-            # Print email details for debugging
-            print("\nEmail Details:")
-            print(f"Subject: {email_data.get('subject', '')}")
-            print(f"From: {email_data.get('from', '')}")
-            print(f"Date: {email_data.get('date', '')}")
-            print("\nEmail Content Markers Found:")
-            
-            # Check for content markers
-            for marker in Config.ORDER_CONTENT_MARKERS:
-                if marker in email_data.get('body', ''):
-                    print(f"✅ Found: {marker}")
-                else:
-                    print(f"❌ Missing: {marker}")
-            
-            # Parse email body
-            email_body = email_data.get('body', '')
-            order_info = self.email_parser.parse_email(email_body)
-            
-            if not order_info:
-                print(f"\n❌ Failed to parse email")
-                print("\nExtracted Fields:")
-                # Try parsing anyway to see what we got
-                temp_info = self.email_parser.parse_email(email_body, debug=True)
-                if temp_info:
-                    for key, value in temp_info.items():
-                        print(f"{key}: {value}")
+        message_ids = []
+        fetched_ids = set()
+        resuming = bool(seen_ids)
+
+        with open(self.csv_orders_file, 'a' if resuming else 'w', newline='', encoding='utf-8') as csvfile, \
+             ThreadPoolExecutor(max_workers=4) as fetch_pool, \
+             ProcessPoolExecutor(max_workers=os.cpu_count()) as parse_pool:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+            if not resuming:
+                writer.writeheader()
+
+            parse_futures = {}
+
+            def _write_result(future):
+                nonlocal processed_count
+                email_data = parse_futures.pop(future)
+                order_info = future.result()
+                if not order_info:
+                    failed_emails.append(email_data)
+                    return
+                order_info['email_id'] = email_data['id']
+                writer.writerow(_format_row(order_info))
+                processed_count += 1
+
+            fetch_futures = []
+            chunk = []
+            for message_id in self.gmail_client.iter_swiggy_ids(max_emails):
+                if message_id in seen_ids:
+                    continue
+                chunk.append(message_id)
+                message_ids.append(message_id)
+                if len(chunk) == GmailClient.BATCH_SIZE:
+                    fetch_futures.append(fetch_pool.submit(
+                        self.gmail_client.get_email_details_batch, chunk))
+                    chunk = []
+            if chunk:
+                fetch_futures.append(fetch_pool.submit(
+                    self.gmail_client.get_email_details_batch, chunk))
+
+            logger.info("Found %d new emails to process (%d already in CSV)",
+                        len(message_ids), len(seen_ids))
+            if not message_ids:
+                logger.warning("No new emails to process.")
+                return
+
+            for fetch_future in as_completed(fetch_futures):
+                for email_data in fetch_future.result():
+                    fetched_ids.add(email_data['id'])
+                    body = email_data.pop('body', '')
+                    parse_futures[parse_pool.submit(parse_body, body)] = email_data
+                # Flush whatever has finished parsing before the next batch
+                for future in [f for f in parse_futures if f.done()]:
+                    _write_result(future)
+
+            for future in tqdm(as_completed(list(parse_futures)), total=len(parse_futures),
+                               desc='Parsing emails', unit='email'):
+                _write_result(future)
+
+        for message_id in message_ids:
+            if message_id not in fetched_ids:
                 failed_emails.append({
                     'id': message_id,
-                    'subject': email_data.get('subject', ''),
-                    'date': email_data.get('date', '')
+                    'subject': '',
+                    'date': ''
                 })
-                continue
-                
-            print("\n✅ Successfully parsed email")
-            print("\nExtracted Order Details:")
-            for key, value in order_info.items():
-                print(f"{key}: {value}")
-                
-            order_info['email_id'] = message_id
-            processed_orders.append(order_info)
-        
-        # Step 3: Save to CSV
-        if processed_orders:
-            self._save_to_csv(processed_orders)
-            print(f"\n✅ Successfully processed {len(processed_orders)} orders")
-            success_rate = (len(processed_orders) / len(messages)) * 100
-            print(f"Success rate: {success_rate:.2f}%")
+
+        # Step 3: Summary
+        if processed_count:
+            logger.info("📄 Saved %d orders to %s", processed_count, self.csv_orders_file)
+            logger.info("✅ Successfully processed %d orders", processed_count)
+            success_rate = (processed_count / len(message_ids)) * 100
+            logger.info("Success rate: %.2f%%", success_rate)
         else:
-            print("\n❌ No orders were successfully processed")
+            logger.warning("❌ No orders were successfully processed")
             
         # Print failed email summary
         if failed_emails:
-            print("\nFailed Emails Summary:")
-            print(f"Total failed: {len(failed_emails)}")
-            print("\nFirst 5 failed emails:")
+            logger.info("Failed Emails Summary:")
+            logger.info("Total failed: %d", len(failed_emails))
+            logger.debug("First 5 failed emails:")
             for email in failed_emails[:5]:
-                print(f"\nID: {email['id']}")
-                print(f"Subject: {email['subject']}")
-                print(f"Date: {email['date']}")
+                logger.debug("ID: %s", email['id'])
+                logger.debug("Subject: %s", email['subject'])
+                logger.debug("Date: %s", email['date'])
     
-    def _save_to_csv(self, orders: List[Dict]):
-        """Save processed orders to CSV"""
-        fieldnames = [
-            'email_id',
-            'restaurant_name',
-            'order_time',
-            'delivery_time',
-            'delivery_duration_mins',
-            'total_amount',
-            'discount_amount'
-        ]
-        
-        try:
-            with open(self.csv_orders_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for order in orders:
-                    row = {
-                        'email_id': order.get('email_id'),
-                        'restaurant_name': order.get('restaurant_name'),
-                        'order_time': order.get('order_time').strftime('%Y-%m-%d %H:%M:%S') if order.get('order_time') else None,
-                        'delivery_time': order.get('delivery_time').strftime('%Y-%m-%d %H:%M:%S') if order.get('delivery_time') else None,
-                        'delivery_duration_mins': order.get('delivery_duration_mins'),
-                        'total_amount': order.get('total_amount'),
-                        'discount_amount': order.get('discount_amount', 0.0)
-                    }
-                    writer.writerow(row)
-                    
-            print(f"\n📄 Saved {len(orders)} orders to {self.csv_orders_file}")
-            
-        except Exception as e:
-            print(f"❌ Error saving to CSV: {str(e)}")
-
 def main():
     """Main function to run the data pipeline"""
     pipeline = SwiggyDataPipeline()
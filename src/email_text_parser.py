@@ -2,33 +2,98 @@
 Parser for Swiggy delivery confirmation emails
 """
 from datetime import datetime
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 import re
 
+# Compiled once at import: matches amounts like "₹1,234.00" / "₹ -50"
+_AMOUNT_RE = re.compile(r'₹\s*(-?[\d,]+(?:\.\d{2})?)')
+# Strips the currency symbol, thousands separators and spaces in one pass
+_CLEAN = str.maketrans('', '', '₹, ')
+
+# Month-name lookup so parse_datetime can avoid strptime's per-call
+# regex/locale machinery for the two fixed Swiggy formats
+_MONTHS = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4,
+    'May': 5, 'June': 6, 'July': 7, 'August': 8,
+    'September': 9, 'October': 10, 'November': 11, 'December': 12,
+}
+
+def _nonblank_lines(text: str):
+    """Yield stripped, non-empty lines without materializing the full list"""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped:
+            yield stripped
+
 class SwiggyEmailParser:
     def parse_datetime(self, datetime_str: str) -> datetime:
         """Parse Swiggy's datetime format"""
         try:
-            # First try the standard format
-            return datetime.strptime(datetime_str.strip(), "%A, %B %d, %Y %I:%M %p")
-        except (ValueError, AttributeError):
-            try:
-                # Try alternative format (if any)
-                return datetime.strptime(datetime_str.strip(), "%d %B %Y %I:%M %p")
-            except (ValueError, AttributeError):
+            parsed = datetime_str.strip()
+            if ',' in parsed:
+                # Standard format: "Monday, July 4, 2022 07:35 PM"
+                _, month_day, rest = parsed.split(', ')
+                month_name, day = month_day.split(' ')
+                year, time_part, meridiem = rest.split(' ')
+            else:
+                # Alternative format: "4 July 2022 07:35 PM"
+                day, month_name, year, time_part, meridiem = parsed.split(' ')
+            # strptime's %p is case-insensitive and rejects anything that
+            # is not AM/PM — keep both properties
+            meridiem = meridiem.upper()
+            if meridiem not in ('AM', 'PM'):
                 return None
+            hour_str, minute_str = time_part.split(':')
+            hour = int(hour_str) % 12
+            if meridiem == 'PM':
+                hour += 12
+            return datetime(int(year), _MONTHS[month_name], int(day), hour, int(minute_str))
+        except (ValueError, KeyError, AttributeError):
+            return None
 
     def extract_amount(self, amount_str: str) -> float:
         """Extract amount from string with ₹ symbol"""
         try:
-            # Remove ₹ symbol, any commas, and handle negative amounts (discounts)
-            amount = amount_str.replace('₹', '').replace(',', '').strip()
-            if amount.startswith('-'):
-                amount = amount[1:]  # Remove minus sign
-            return float(amount)
+            # Remove ₹ symbol, commas and spaces in one translate pass,
+            # and handle negative amounts (discounts)
+            amount = amount_str.translate(_CLEAN).strip().lstrip('-')
+            return float(amount) if amount else 0.0
         except (ValueError, AttributeError):
             return 0.0
 
+    def _consume_datetime(self, marker: str, line: str, it) -> datetime:
+        """Find a datetime on the marker line itself or the next two lines"""
+        parsed = self.parse_datetime(line.replace(marker, "").strip())
+        if parsed:
+            return parsed
+        for _ in range(2):
+            next_line = next(it, None)
+            if next_line is None:
+                break
+            parsed = self.parse_datetime(next_line.replace(marker, "").strip())
+            if parsed:
+                return parsed
+        return None
+
+    def _consume_amount(self, line: str, it, negative: bool = False) -> float:
+        """Find an amount on the current line or the next two lines"""
+        for attempt in range(3):
+            if attempt:
+                line = next(it, None)
+                if line is None:
+                    break
+            if '₹' in line and (not negative or '-' in line):
+                amount = self.extract_amount(line)
+                if amount == 0.0 and not negative:
+                    # The amount may be embedded in surrounding text
+                    # (e.g. "Order Total: ₹123") — fall back to the pattern
+                    match = _AMOUNT_RE.search(line)
+                    if match:
+                        amount = self.extract_amount(match.group(1))
+                if amount > 0 or negative:
+                    return amount
+        return None
+
     def parse_email(self, email_text: str, debug: bool = False) -> dict:
         """Parse Swiggy delivery email text to extract order details"""
         if not email_text:
@@ -37,26 +102,31 @@ class SwiggyEmailParser:
             return None
 
         # Convert HTML to clean text while preserving some structure
-        soup = BeautifulSoup(email_text, 'html.parser')
-        
+        tree = HTMLParser(email_text)
+
         # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-            
+        tree.strip_tags(['script', 'style'])
+
         # Get text with preserved line breaks
-        text = soup.get_text(separator='\n')
-        
-        # Clean up text
-        lines = []
-        for line in text.split('\n'):
-            line = line.strip()
-            if line and not line.isspace():
-                lines.append(line)
+        if tree.body is not None:
+            text = tree.body.text(separator='\n')
+        else:
+            text = tree.text(separator='\n')
 
+        if not text:
+            if debug:
+                print("No text content in email")
+            return None
+
+        # Stream cleaned lines; only materialize them when debugging
         if debug:
+            lines = list(_nonblank_lines(text))
             print("\nCleaned Text Lines:")
             for i, line in enumerate(lines[:50]):  # Print first 50 lines
                 print(f"{i}: {line}")
+            line_source = lines
+        else:
+            line_source = _nonblank_lines(text)
 
         order_info = {
             'restaurant_name': None,
@@ -67,85 +137,66 @@ class SwiggyEmailParser:
             'discount_amount': 0.0
         }
 
-        # Extract restaurant name
-        restaurant_found = False
-        for i, line in enumerate(lines):
+        # Single linear pass: each marker consumes its payload from the
+        # iterator instead of re-scanning lines[i+1:] slices per field,
+        # and the scan stops as soon as every field has been found
+        total_markers = ("Order Total:", "Paid Via", "Total Payable:")
+        remaining = {'restaurant_name', 'order_time', 'delivery_time',
+                     'total_amount', 'discount_amount'}
+        it = iter(line_source)
+        for line in it:
             if line == "Restaurant" or "Ordered from:" in line:
-                for next_line in lines[i+1:i+5]:  # Look at next few lines
-                    if next_line and next_line not in ["Order", "Your Order Summary:", "Order No:", "Delivery To:"]:
-                        order_info['restaurant_name'] = next_line
-                        restaurant_found = True
-                        break
-                if restaurant_found:
-                    break
+                if order_info['restaurant_name'] is None:
+                    # Skip boilerplate between the marker and the name
+                    candidate = None
+                    for _ in range(4):
+                        candidate = next(it, None)
+                        if candidate not in ("Order", "Your Order Summary:", "Order No:", "Delivery To:"):
+                            break
+                    if candidate and candidate not in ("Order", "Your Order Summary:", "Order No:", "Delivery To:"):
+                        order_info['restaurant_name'] = candidate
+                        remaining.discard('restaurant_name')
+
+            elif "Order placed at:" in line:
+                parsed_date = self._consume_datetime("Order placed at:", line, it)
+                if parsed_date:
+                    order_info['order_time'] = parsed_date
+                    remaining.discard('order_time')
+                    if debug:
+                        print(f"\nFound order time: {parsed_date}")
 
-        # Extract order and delivery times
-        for i, line in enumerate(lines):
-            # Look for order time
-            if "Order placed at:" in line:
-                # Look for the datetime in this line or the next few lines
-                for j in range(i, min(i + 3, len(lines))):
-                    possible_date = lines[j].replace("Order placed at:", "").strip()
-                    parsed_date = self.parse_datetime(possible_date)
-                    if parsed_date:
-                        order_info['order_time'] = parsed_date
-                        if debug:
-                            print(f"\nFound order time: {parsed_date}")
-                        break
-            
-            # Look for delivery time
             elif "Order delivered at:" in line:
-                # Look for the datetime in this line or the next few lines
-                for j in range(i, min(i + 3, len(lines))):
-                    possible_date = lines[j].replace("Order delivered at:", "").strip()
-                    parsed_date = self.parse_datetime(possible_date)
-                    if parsed_date:
-                        order_info['delivery_time'] = parsed_date
-                        if debug:
-                            print(f"\nFound delivery time: {parsed_date}")
-                        break
+                parsed_date = self._consume_datetime("Order delivered at:", line, it)
+                if parsed_date:
+                    order_info['delivery_time'] = parsed_date
+                    remaining.discard('delivery_time')
+                    if debug:
+                        print(f"\nFound delivery time: {parsed_date}")
+
+            elif any(marker in line for marker in total_markers):
+                amount = self._consume_amount(line, it)
+                if amount:
+                    order_info['total_amount'] = amount
+                    remaining.discard('total_amount')
+                    if debug:
+                        print(f"\nFound total amount: {amount}")
+
+            elif "Discount Applied" in line:
+                amount = self._consume_amount(line, it, negative=True)
+                if amount is not None:
+                    order_info['discount_amount'] = amount
+                    remaining.discard('discount_amount')
+                    if debug:
+                        print(f"\nFound discount amount: {order_info['discount_amount']}")
+
+            if not remaining:
+                break
 
         # Calculate delivery duration
         if order_info['order_time'] and order_info['delivery_time']:
             duration = order_info['delivery_time'] - order_info['order_time']
             order_info['delivery_duration_mins'] = duration.total_seconds() / 60
 
-        # Extract amounts using more flexible patterns
-        for i, line in enumerate(lines):
-            # Look for total amount
-            if any(marker in line for marker in ["Order Total:", "Paid Via", "Total Payable:"]):
-                # Check this line and next few lines for amount
-                for j in range(i, min(i + 3, len(lines))):
-                    if '₹' in lines[j]:
-                        amount = self.extract_amount(lines[j])
-                        if amount > 0:  # Sanity check
-                            order_info['total_amount'] = amount
-                            if debug:
-                                print(f"\nFound total amount: {amount}")
-                            break
-
-            # Look for discount
-            if "Discount Applied" in line:
-                # Check this line and next few lines for amount
-                for j in range(i, min(i + 3, len(lines))):
-                    if '₹' in lines[j] and '-' in lines[j]:
-                        order_info['discount_amount'] = self.extract_amount(lines[j])
-                        if debug:
-                            print(f"\nFound discount amount: {order_info['discount_amount']}")
-                        break
-
-        # Additional validation
-        if not order_info['total_amount']:
-            # Try finding total amount by looking for specific patterns
-            for line in lines:
-                if any(marker in line for marker in ["Order Total:", "Paid Via", "Total Payable:"]):
-                    amounts = re.findall(r'₹\s*[\d,]+(?:\.\d{2})?', line)
-                    if amounts:
-                        order_info['total_amount'] = self.extract_amount(amounts[0])
-                        if debug:
-                            print(f"\nFound total amount (pattern): {order_info['total_amount']}")
-                        break
-
         # Validate required fields
         required_fields = [
             'restaurant_name',
@@ -2,251 +2,529 @@
 Gmail API client for fetching Swiggy emails
 """
 import os
-import base64
+import binascii
+import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
-from datetime import datetime
-from bs4 import BeautifulSoup
+
+import ahocorasick
+import orjson
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from googleapiclient.model import JsonModel
+
+from cache import MessageCache
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Maps the base64url alphabet onto standard base64 so bodies can be
+# decoded with binascii directly — base64.urlsafe_b64decode does this
+# same translate internally plus several layers of Python wrapping
+_URLSAFE_TRANSLATE = bytes.maketrans(b'-_', b'+/')
+
+# Gmail returns canonical header casing, so matching the handful of
+# expected spellings directly skips allocating a lowercased copy of
+# every header name (Swiggy emails carry 30+ headers each)
+_HEADER_KEYS = {
+    'Subject': 'subject', 'subject': 'subject', 'SUBJECT': 'subject',
+    'From': 'from', 'from': 'from', 'FROM': 'from',
+    'Date': 'date', 'date': 'date', 'DATE': 'date',
+}
+_FROM_NAMES = frozenset({'From', 'from', 'FROM'})
+
+# Discovery document pinned alongside the code, so service construction
+# never depends on what the installed client library happens to bundle
+_DISCOVERY_FILE = os.path.join(
+    os.path.dirname(__file__), 'resources', 'gmail_v1_discovery.json')
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that parses API responses with orjson.
 
-from config import Config
+    messages.get(format='full') responses are large JSON blobs; orjson's
+    C parser decodes them several times faster than the stdlib json used
+    by the default model.
+    """
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Same degradation as JsonModel: hand back the raw content
+            # when the response body is empty or not JSON
+            return content
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
+# Process-wide caches so repeated GmailClient() constructions don't
+# re-read/parse token.json or rebuild the discovery-based service
+_CREDS_CACHE: Dict = {}
+_SERVICE_CACHE: Dict = {}
 
 class GmailClient:
     SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
     MAX_RETRIES = 3
     RETRY_DELAY = 1  # seconds
+    BATCH_SIZE = 100  # Gmail batch endpoint limit per HTTP request
 
     def __init__(self):
+        self.config = get_config()
         self.creds = self._get_credentials()
-        self.service = build('gmail', 'v1', credentials=self.creds)
+        self.service = self._get_service(self.creds)
+
+        # Config is frozen for the life of the process, so the list
+        # query is composed once here instead of on every list call
+        self._list_query = self._build_list_query(self.config)
+
+        # Message bodies are immutable, so previously fetched messages
+        # are served from the local SQLite cache on warm runs
+        self._message_cache = MessageCache()
+
+        # httplib2.Http is not thread-safe, so every request executes on
+        # a per-thread AuthorizedHttp instead of the service's shared one
+        self._local = threading.local()
+
+        # One automaton finds every content marker in a single pass over
+        # the body instead of one substring scan per marker
+        self._marker_automaton = ahocorasick.Automaton()
+        for marker in self.config.ORDER_CONTENT_MARKERS:
+            self._marker_automaton.add_word(marker, marker)
+        self._marker_automaton.make_automaton()
 
     def _get_credentials(self) -> Credentials:
-        """Get valid user credentials from storage or user."""
+        """Get valid user credentials from the cache, storage or user."""
+        token_file = self.config.TOKEN_FILE
+        mtime = os.path.getmtime(token_file) if os.path.exists(token_file) else None
+
+        # Reuse parsed credentials while the token file is unchanged
+        cached = _CREDS_CACHE.get((token_file, mtime))
+        if cached is not None and cached.valid:
+            return cached
+
         creds = None
-        
+
         # Check if token.json exists
-        if os.path.exists(Config.TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(Config.TOKEN_FILE, self.SCOPES)
+        if mtime is not None:
+            creds = Credentials.from_authorized_user_file(token_file, self.SCOPES)
 
         # If no valid credentials available, let the user log in
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
-                if not os.path.exists(Config.CREDENTIALS_FILE):
+                if not os.path.exists(self.config.CREDENTIALS_FILE):
                     raise FileNotFoundError("Please place your Gmail API credentials file at credentials.json")
-                
+
                 flow = InstalledAppFlow.from_client_secrets_file(
-                    Config.CREDENTIALS_FILE, self.SCOPES)
+                    self.config.CREDENTIALS_FILE, self.SCOPES)
                 creds = flow.run_local_server(port=0)
-            
+
             # Save the credentials for the next run
-            with open(Config.TOKEN_FILE, 'w') as token:
+            with open(token_file, 'w') as token:
                 token.write(creds.to_json())
 
+        _CREDS_CACHE[(token_file, os.path.getmtime(token_file))] = creds
         return creds
 
-    def search_swiggy_emails(self, max_results: int = 500) -> List[Dict]:
-        """Search for Swiggy delivery confirmation emails"""
+    @staticmethod
+    def _build_list_query(config) -> str:
+        """Compose the messages.list query string: sender plus the
+        optional date range from config."""
         # Primary search is based on sender
-        query = f'from:{Config.SWIGGY_SENDER}'
-        
-        # Add date range if specified
-        if Config.START_DATE:
-            query += f' AND after:{Config.START_DATE.replace("/", "-")}'
-        if Config.END_DATE:
-            query += f' AND before:{Config.END_DATE.replace("/", "-")}'
-
-        print(f"\nSearching with query: {query}")
-        
-        try:
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=min(max_results, 500)  # Gmail API max per request
-            ).execute()
+        clauses = [f'from:{config.SWIGGY_SENDER}']
+        if config.START_DATE:
+            clauses.append(f'after:{config.START_DATE.replace("/", "-")}')
+        if config.END_DATE:
+            clauses.append(f'before:{config.END_DATE.replace("/", "-")}')
+        return ' AND '.join(clauses)
+
+    def _get_service(self, creds: Credentials):
+        """Build the Gmail service once per token file state.
+
+        Cached under the same (token_file, mtime) key as the parsed
+        credentials, so a service is reused exactly as long as the
+        credentials it was built with stay current.
+
+        The service is built from the discovery document vendored in
+        src/resources, so construction does no network I/O and does not
+        depend on the client library bundling a gmail.v1 document. If
+        the vendored file is missing, static_discovery falls back to
+        the library's own bundled copy.
+        """
+        token_file = self.config.TOKEN_FILE
+        mtime = os.path.getmtime(token_file) if os.path.exists(token_file) else None
+        key = (token_file, mtime)
+
+        service = _SERVICE_CACHE.get(key)
+        if service is None:
+            if os.path.exists(_DISCOVERY_FILE):
+                with open(_DISCOVERY_FILE, 'rb') as doc:
+                    service = build_from_document(
+                        doc.read(), credentials=creds, model=_OrjsonModel())
+            else:
+                service = build('gmail', 'v1', credentials=creds,
+                                static_discovery=True, model=_OrjsonModel())
+            _SERVICE_CACHE[key] = service
+        return service
+
+    def _thread_http(self) -> AuthorizedHttp:
+        """Return this thread's AuthorizedHttp, building it on first use.
+
+        The fetch paths run requests from thread pools, and the client
+        library requires a separate httplib2.Http per thread.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.creds, http=build_http())
+            self._local.http = http
+        return http
+
+    def iter_swiggy_ids(self, max_results: int = 500):
+        """Yield Swiggy message IDs page by page as the list call paginates.
+
+        Generator form of search_swiggy_emails: callers can start
+        fetching details for one page while the next list request is
+        still in flight, instead of waiting for all pages up front.
+        """
+        query = self._list_query
+        logger.info("Searching with query: %s", query)
+
+        page_token = None
+        yielded = 0
+        page_count = 0
+        while yielded < max_results:
+            page_count += 1
+            try:
+                results = self.service.users().messages().list(
+                    userId='me',
+                    q=query,
+                    maxResults=min(max_results - yielded, 500),  # Gmail API max per request
+                    pageToken=page_token
+                ).execute(http=self._thread_http())
+            except HttpError as e:
+                logger.error("Error fetching page %d: %s", page_count, e)
+                return
+            except Exception as e:
+                logger.error("Error searching emails: %s", e)
+                return
 
             messages = results.get('messages', [])
-            total_found = len(messages)
-            print(f"Initial batch found: {total_found} messages")
-            
-            # If we got max_results, there might be more
-            page_count = 1
-            while 'nextPageToken' in results and len(messages) < max_results:
-                page_count += 1
-                print(f"\nFetching page {page_count}...")
-                
-                try:
-                    results = self.service.users().messages().list(
-                        userId='me',
-                        q=query,
-                        maxResults=min(max_results - len(messages), 500),
-                        pageToken=results['nextPageToken']
-                    ).execute()
-                    new_messages = results.get('messages', [])
-                    messages.extend(new_messages)
-                    print(f"Found {len(new_messages)} more messages (Total: {len(messages)})")
-                except HttpError as e:
-                    print(f"Error fetching page {page_count}: {str(e)}")
-                    break
+            logger.debug("Page %d found: %d messages (Total: %d)", page_count, len(messages), yielded + len(messages))
+            for message in messages:
+                yield message['id']
+                yielded += 1
 
-            return messages
-        except Exception as e:
-            print(f"Error searching emails: {str(e)}")
-            return []
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def search_swiggy_emails(self, max_results: int = 500) -> List[Dict]:
+        """Search for Swiggy delivery confirmation emails"""
+        return [{'id': message_id} for message_id in self.iter_swiggy_ids(max_results)]
 
     def get_email_details(self, message_id: str) -> Optional[Dict]:
-        """Get email details including body text"""
+        """Get email details including body text.
+
+        Probes headers first with a cheap metadata request and only
+        downloads the full MIME tree when the sender matches, so
+        non-Swiggy messages never cost a body transfer. Previously
+        fetched messages come straight from the local cache.
+        """
+        cached = self._message_cache.get(message_id)
+        if cached is not None:
+            return cached
+
         for attempt in range(self.MAX_RETRIES):
             try:
-                message = self.service.users().messages().get(
+                probe = self.service.users().messages().get(
                     userId='me',
                     id=message_id,
-                    format='full'
-                ).execute()
-
-                email_data = {
-                    'id': message_id,
-                    'subject': '',
-                    'from': '',
-                    'date': '',
-                    'body': ''
-                }
-
-                if 'payload' not in message:
-                    print(f"No payload in message: {message_id}")
-                    return None
+                    format='metadata',
+                    metadataHeaders=['From', 'Subject', 'Date'],
+                    fields='id,payload/headers'
+                ).execute(http=self._thread_http())
 
-                if 'headers' not in message['payload']:
-                    print(f"No headers in message payload: {message_id}")
+                if self.config.SWIGGY_SENDER not in self._from_header(probe):
                     return None
 
-                # Get headers
-                for header in message['payload']['headers']:
-                    name = header['name'].lower()
-                    if name == 'subject':
-                        email_data['subject'] = header['value']
-                    elif name == 'from':
-                        email_data['from'] = header['value']
-                    elif name == 'date':
-                        email_data['date'] = header['value']
-
-                # Get email body
-                email_data['body'] = self._extract_email_body(message['payload'])
-                
-                if not email_data['body']:
-                    print(f"Could not extract body from message: {message_id}")
-                    print("Message payload structure:", message['payload'].keys())
-                    return None
+                message = self.service.users().messages().get(
+                    userId='me',
+                    id=message_id,
+                    format='full',
+                    fields='payload'
+                ).execute(http=self._thread_http())
 
-                # Print email details for debugging
-                print("\nEmail Details:")
-                print(f"From: {email_data['from']}")
-                print(f"Subject: {email_data['subject']}")
-                print(f"Date: {email_data['date']}")
-                print("\nBody Preview (first 200 chars):")
-                print(email_data['body'][:200] + "...")
-
-                # Validate this is a Swiggy order email by checking content markers
-                if not self._is_valid_order_email(email_data):
-                    print(f"\nEmail validation failed for {message_id}")
-                    return None
-                    
+                email_data = self._build_email_data(message_id, message)
+                if email_data:
+                    self._message_cache.put(email_data)
                 return email_data
 
             except HttpError as e:
                 if e.resp.status == 429:  # Rate limit exceeded
                     if attempt < self.MAX_RETRIES - 1:
                         wait_time = (attempt + 1) * self.RETRY_DELAY
-                        print(f"Rate limit hit, waiting {wait_time} seconds...")
+                        logger.warning("Rate limit hit, waiting %d seconds...", wait_time)
                         time.sleep(wait_time)
                         continue
-                print(f"HTTP Error getting email {message_id}: {str(e)}")
+                logger.error("HTTP Error getting email %s: %s", message_id, e)
                 return None
             except Exception as e:
-                print(f"Error getting email {message_id}: {str(e)}")
+                logger.error("Error getting email %s: %s", message_id, e)
                 return None
-        
+
         return None
 
+    def get_email_details_batch(self, message_ids: List[str]) -> List[Dict]:
+        """Fetch email details for many messages via the Gmail batch endpoint.
+
+        Two batched stages: a metadata probe (headers only) filters out
+        non-Swiggy senders cheaply, then the full MIME tree is fetched
+        only for the survivors. Invalid or failed messages are dropped,
+        matching get_email_details returning None. Cached messages skip
+        both stages entirely.
+        """
+        email_details = []
+        misses = []
+        for message_id in message_ids:
+            cached = self._message_cache.get(message_id)
+            if cached is not None:
+                email_details.append(cached)
+            else:
+                misses.append(message_id)
+        if not misses:
+            return email_details
+
+        probes = self._execute_batches(
+            misses,
+            lambda message_id: self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='metadata',
+                metadataHeaders=['From', 'Subject', 'Date'],
+                fields='id,payload/headers'
+            )
+        )
+
+        swiggy_ids = [
+            message_id for message_id in misses
+            if message_id in probes
+            and self.config.SWIGGY_SENDER in self._from_header(probes[message_id])
+        ]
+
+        responses = self._execute_batches(
+            swiggy_ids,
+            lambda message_id: self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='full',
+                fields='payload'
+            )
+        )
+
+        fetched = []
+        for message_id in swiggy_ids:
+            if message_id not in responses:
+                continue
+            email_data = self._build_email_data(message_id, responses[message_id])
+            if email_data:
+                fetched.append(email_data)
+
+        self._message_cache.put_many(fetched)
+        email_details.extend(fetched)
+        return email_details
+
+    def _execute_batches(self, message_ids: List[str], make_request) -> Dict[str, Dict]:
+        """Run one request per message ID through the batch endpoint.
+
+        Packs up to BATCH_SIZE sub-requests per HTTP round-trip and
+        re-batches rate-limited IDs with backoff. Returns the responses
+        keyed by message ID.
+        """
+        responses = {}
+        retry_ids = []
+
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                if isinstance(exception, HttpError) and exception.resp.status == 429:
+                    retry_ids.append(request_id)
+                else:
+                    logger.error("Error fetching email %s: %s", request_id, exception)
+                return
+            responses[request_id] = response
+
+        pending = list(message_ids)
+        for attempt in range(self.MAX_RETRIES):
+            retry_ids.clear()
+            for start in range(0, len(pending), self.BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=_collect)
+                for message_id in pending[start:start + self.BATCH_SIZE]:
+                    batch.add(make_request(message_id), request_id=message_id)
+                try:
+                    batch.execute(http=self._thread_http())
+                except HttpError as e:
+                    logger.error("Error executing batch request: %s", e)
+
+            if not retry_ids:
+                break
+            if attempt == self.MAX_RETRIES - 1:
+                logger.warning("Giving up on %d rate-limited messages", len(retry_ids))
+                break
+
+            # Re-batch only the rate-limited IDs with backoff
+            wait_time = (attempt + 1) * self.RETRY_DELAY
+            logger.warning("Rate limit hit for %d messages, waiting %d seconds...", len(retry_ids), wait_time)
+            time.sleep(wait_time)
+            pending = list(retry_ids)
+
+        return responses
+
+    @staticmethod
+    def _from_header(message: Dict) -> str:
+        """Return the From header value of a fetched message, or ''"""
+        for header in message.get('payload', {}).get('headers', []):
+            if header['name'] in _FROM_NAMES:
+                return header['value']
+        return ''
+
+    def get_email_details_many(self, message_ids: List[str], concurrency: int = 20) -> List[Dict]:
+        """Fetch email details concurrently with a thread pool.
+
+        Thread-based alternative to get_email_details_batch: each
+        messages.get is I/O-bound, so overlapping up to `concurrency`
+        round-trips hides most of the per-request latency while staying
+        well under Gmail's per-user quota. Failed or invalid messages
+        are dropped, as in the serial path.
+        """
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = pool.map(self.get_email_details, message_ids)
+        return [email_data for email_data in results if email_data]
+
+    def _build_email_data(self, message_id: str, message: Dict) -> Optional[Dict]:
+        """Extract headers and body from a fetched message and validate it"""
+        email_data = {
+            'id': message_id,
+            'subject': '',
+            'from': '',
+            'date': '',
+            'body': ''
+        }
+
+        if 'payload' not in message:
+            logger.debug("No payload in message: %s", message_id)
+            return None
+
+        if 'headers' not in message['payload']:
+            logger.debug("No headers in message payload: %s", message_id)
+            return None
+
+        # Get headers — one dict lookup per header, stop once all three
+        # wanted values are filled
+        found = 0
+        for header in message['payload']['headers']:
+            key = _HEADER_KEYS.get(header['name'])
+            if key is not None:
+                email_data[key] = header['value']
+                found += 1
+                if found == 3:
+                    break
+
+        # Get email body
+        email_data['body'] = self._extract_email_body(message['payload'])
+
+        if not email_data['body']:
+            logger.debug("Could not extract body from message: %s (payload keys: %s)",
+                         message_id, list(message['payload'].keys()))
+            return None
+
+        # Validate this is a Swiggy order email by checking content markers
+        if not self._is_valid_order_email(email_data):
+            logger.debug("Email validation failed for %s", message_id)
+            return None
+
+        return email_data
+
     def _extract_email_body(self, payload: Dict) -> str:
-        """Recursively extract email body from message payload"""
+        """Extract the email body from a message payload.
+
+        Iterative depth-first walk over the MIME tree with an explicit
+        stack — no Python frame per nested multipart. text/html wins
+        over other text parts; the first HTML hit ends the walk.
+
+        Returns the decoded part content as-is — raw HTML for text/html
+        parts. Marker validation matches directly against this string,
+        and the one HTML-to-text conversion happens downstream in
+        SwiggyEmailParser, so no tree is ever built here.
+        """
         try:
-            if 'body' in payload and payload['body'].get('data'):
-                return base64.urlsafe_b64decode(payload['body']['data']).decode()
-            
-            if 'parts' in payload:
-                # First try to find HTML content
-                for part in payload['parts']:
-                    if part['mimeType'] == 'text/html' and 'data' in part.get('body', {}):
-                        try:
-                            text = base64.urlsafe_b64decode(part['body']['data']).decode()
-                            return text
-                        except Exception as e:
-                            print(f"Error decoding HTML part: {str(e)}")
-                            continue
-                
-                # If no HTML, try other text content
-                for part in payload['parts']:
-                    if part['mimeType'].startswith('text/'):
-                        if 'data' in part.get('body', {}):
-                            try:
-                                return base64.urlsafe_b64decode(part['body']['data']).decode()
-                            except Exception as e:
-                                print(f"Error decoding text part: {str(e)}")
-                                continue
-                    elif part['mimeType'].startswith('multipart/'):
-                        body = self._extract_email_body(part)
-                        if body:
-                            return body
-            
-            print("Could not find any text content in payload")
+            text_raw = None
+            stack = [payload]
+            while stack:
+                part = stack.pop()
+                mime = part.get('mimeType', '')
+                data = (part.get('body') or {}).get('data')
+
+                # Only text parts are candidates — inline images and other
+                # attachments also carry body.data and must not shadow a
+                # text sibling. Root-level data is kept regardless of type
+                # for parity with single-part messages.
+                if data and (mime.startswith('text/') or part is payload):
+                    # Keep bytes through the walk; the str decode happens
+                    # exactly once, on the part that is actually returned
+                    try:
+                        raw = binascii.a2b_base64(
+                            data.encode('ascii').translate(_URLSAFE_TRANSLATE))
+                    except Exception as e:
+                        logger.debug("Error decoding %s part: %s", mime, e)
+                        continue
+                    if mime == 'text/html':
+                        return raw.decode('utf-8', 'replace')
+                    if text_raw is None:
+                        text_raw = raw
+                elif 'parts' in part:
+                    # reversed() keeps the original part order under pop()
+                    stack.extend(reversed(part['parts']))
+
+            if text_raw is not None:
+                return text_raw.decode('utf-8', 'replace')
+
+            logger.debug("Could not find any text content in payload")
             return ""
-            
+
         except Exception as e:
-            print(f"Error extracting email body: {str(e)}")
+            logger.error("Error extracting email body: %s", e)
             return ""
 
     def _is_valid_order_email(self, email_data: Dict) -> bool:
         """
         Validate if this is a Swiggy order email by checking for specific content markers
-        rather than relying solely on email subject
+        rather than relying solely on email subject.
+
+        The sender has already been verified against the metadata probe
+        before the body was ever fetched, so only content is checked here.
         """
-        # Check sender - look for noreply@swiggy.in in the From field
-        if Config.SWIGGY_SENDER not in email_data['from']:
-            print(f"Invalid sender: {email_data['from']}")
-            return False
-            
         body = email_data['body']
         if not body:
-            print("Empty email body")
+            logger.debug("Empty email body")
             return False
             
-        # Check for presence of key order content markers
-        markers_found = []
-        for marker in Config.ORDER_CONTENT_MARKERS:
-            if marker in body:
-                markers_found.append(marker)
-                
-        # Print found markers for debugging
-        print("\nContent markers found:")
-        for marker in markers_found:
-            print(f"✓ {marker}")
-        
-        missing_markers = [m for m in Config.ORDER_CONTENT_MARKERS if m not in markers_found]
-        if missing_markers:
-            print("\nMissing markers:")
-            for marker in missing_markers:
-                print(f"✗ {marker}")
-                
-        # Require at least 3 markers to consider it a valid order email
-        if len(markers_found) < 3:
-            print(f"\nInsufficient markers: found {len(markers_found)}, need at least 3")
-            return False
-            
-        return True
\ No newline at end of file
+        # Check for key order content markers in one linear scan over the
+        # body; 3 distinct markers are enough to accept the email
+        markers_found = set()
+        for _, marker in self._marker_automaton.iter(body):
+            markers_found.add(marker)
+            if len(markers_found) >= 3:
+                return True
+
+        missing_markers = set(self.config.ORDER_CONTENT_MARKERS) - markers_found
+        logger.debug("Insufficient markers: found %d, need at least 3; missing: %s",
+                     len(markers_found), sorted(missing_markers))
+        return False
\ No newline at end of file